@@ -578,6 +578,12 @@ class Experiment(object):
         print("Training on device {} under {}".format(self.device, model_save_path))
         print(model)
         cudnn.benchmark = True
+        # Loss scaling is only needed for float16 autocast, which only the 2D
+        # CNN applies; otherwise a no-op.
+        scaler = torch.cuda.amp.GradScaler(
+            enabled=self.model_obj.autocast_dtype == torch.float16
+            and not self.model_obj.ts1d_model
+        )
         since = time.time()
         best_validate_metrics = {"loss": 10.0, "accy": 0.0, "MCC": 0.0, "epoch": 0}
         best_model = copy.deepcopy(model.state_dict())
@@ -626,9 +632,10 @@ class Experiment(object):
                         loss = self.loss_from_model_output(labels, outputs)
                         _, preds = torch.max(outputs, 1)
                         if phase == "train":
-                            optimizer.zero_grad() # Zero the gradients
-                            loss.backward()       # Backpropagate the loss 
-                            optimizer.step()      # Update weights  
+                            optimizer.zero_grad()         # Zero the gradients
+                            scaler.scale(loss).backward() # Backpropagate the loss
+                            scaler.step(optimizer)        # Update weights
+                            scaler.update()
                     self._update_running_metrics(loss, labels, preds, running_metrics)
                     del inputs, labels
                 num_samples = len(dataloaders_dict[phase].dataset)
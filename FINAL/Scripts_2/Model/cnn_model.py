@@ -8,14 +8,24 @@
 # The CNN takes OHLC chart images (or time-series features for 1D CNN) as inputs and outputs probabilities
 # for future stock price up-ticks.
 
+import functools
+import itertools
+import logging
+import types
+
 import torch
 import torch.nn as nn
-import numpy as np
-
-from torchsummary import summary
 
 from Misc import config as cf
 
+logger = logging.getLogger(__name__)
+
+# Input shape per window size `ws' (Section II):
+# - 2D CNN: (height, width) of the OHLC chart image (1 channel),
+# - 1D CNN: (number of features, sequence length).
+_TS2D_INPUT = types.MappingProxyType({5: (32, 15), 20: (64, 60), 60: (96, 180)})
+_TS1D_INPUT = types.MappingProxyType({5: (6, 5), 20: (6, 20), 60: (6, 60)})
+
 # Model Class:
 #
 # Acts as a ``wrapper/factory'' for creating CNN models with configurable
@@ -53,26 +63,35 @@ class Model(object):
         bn_loc="bn_bf_relu",
         conv_layer_chanls=None,
         regression_label=None,
+        compile_model=False,
+        autocast_dtype=None, # 2D CNN only; requires torch >= 1.10
+        channels_last=None,
     ):
         self.ws = ws
         self.layer_number = layer_number
         self.inplanes = inplanes
         self.drop_prob = drop_prob
-        self.filter_size_list = (
-            [filter_size] * self.layer_number
+        # Per-layer settings are stored as tuples: they are only ever indexed,
+        # and tuples can be passed straight to the memoized helpers below.
+        self.filter_size_list = tuple(
+            itertools.repeat(filter_size, self.layer_number)
             if filter_size_list is None
             else filter_size_list
         )
-        self.stride_list = (
-            [stride] * self.layer_number if stride_list is None else stride_list
+        self.stride_list = tuple(
+            itertools.repeat(stride, self.layer_number)
+            if stride_list is None
+            else stride_list
         )
-        self.max_pooling_list = (
-            [max_pooling] * self.layer_number
+        self.max_pooling_list = tuple(
+            itertools.repeat(max_pooling, self.layer_number)
             if max_pooling_list is None
             else max_pooling_list
         )
-        self.dilation_list = (
-            [dilation] * self.layer_number if dilation_list is None else dilation_list
+        self.dilation_list = tuple(
+            itertools.repeat(dilation, self.layer_number)
+            if dilation_list is None
+            else dilation_list
         )
         self.batch_norm = batch_norm
         self.xavier = xavier
@@ -82,12 +101,11 @@ class Model(object):
         self.conv_layer_chanls = conv_layer_chanls
         self.regression_label = regression_label
         assert self.regression_label in [None, "raw_ret", "vol_adjust_ret"]
+        self.compile_model = compile_model
+        self.autocast_dtype = autocast_dtype
+        self.channels_last = channels_last
 
-        self.padding_list = (
-            [int(fs / 2) for fs in self.filter_size_list]
-            if self.ts1d_model
-            else [(int(fs[0] / 2), int(fs[1] / 2)) for fs in self.filter_size_list]
-        )
+        self.padding_list = _compute_padding(self.filter_size_list, self.ts1d_model)
         self.name = get_full_model_name(
             self.ts1d_model,
             self.ws,
@@ -102,7 +120,9 @@ class Model(object):
             xavier=self.xavier,
             lrelu=self.lrelu,
             bn_loc=self.bn_loc,
-            conv_layer_chanls=conv_layer_chanls,
+            conv_layer_chanls=(
+                None if conv_layer_chanls is None else tuple(conv_layer_chanls)
+            ),
             regression_label=self.regression_label,
         )
 
@@ -114,10 +134,39 @@ class Model(object):
     # - CNNModel: for image-based input,
     # - CNN1DModel: for time-series input.
     #
-    # Loads pretrained state_dict weights if provided.
+    # Loads pretrained state_dict weights if provided. Only the conv_layers.*
+    # entries that exist in this model with the same shape are loaded, so a
+    # checkpoint with a different FC head, `ws' or depth can seed the conv stack.
     # Ties back to Section II (core CNN) and Appendix (model details).
+    #
+    # On CUDA, enables cuDNN autotuning: input shapes are fixed per `ws', so the
+    # best convolution algorithm is picked once and cached for later batches.
+    # TF32 matmuls/convolutions are only enabled when mixed precision is
+    # requested (autocast_dtype set), since they change FP32 numerics for the
+    # whole process; the default path keeps full FP32 precision.
+    #
+    # The 2D CNN uses the channels_last (NHWC) layout if `channels_last' is
+    # True. If it is None (default), NHWC is used only when `device' is a
+    # CUDA device, since it slows down the CPU path.
+    #
+    # With compile_model=True, the 2D CNN is compiled in place with TorchInductor
+    # (static shapes, one graph per `ws'). Compiling in place keeps the module
+    # type and state_dict keys unchanged, so checkpoints stay interchangeable.
+    # Requires torch >= 2.0: nn.Module.compile is used on torch >= 2.2, and
+    # model.forward is compiled with torch.compile on 2.0/2.1. On older torch
+    # (e.g. the pinned cnn_env.yml) a warning is logged and the model runs eagerly.
+    # Passing compile_model overrides the setting given to the constructor.
 
-    def init_model(self, device=None, state_dict=None):
+    def init_model(self, device=None, state_dict=None, compile_model=None):
+        if compile_model is None:
+            compile_model = self.compile_model
+        on_cuda = device is not None and torch.device(device).type == "cuda"
+        channels_last = on_cuda if self.channels_last is None else self.channels_last
+        if on_cuda:
+            torch.backends.cudnn.benchmark = True
+            if self.autocast_dtype is not None:
+                torch.backends.cuda.matmul.allow_tf32 = True
+                torch.backends.cudnn.allow_tf32 = True
         if self.ts1d_model:
             model = CNN1DModel(
                 self.layer_number,
@@ -148,36 +197,106 @@ class Model(object):
                 bn_loc=self.bn_loc,
                 conv_layer_chanls=self.conv_layer_chanls,
                 regression_label=self.regression_label,
+                autocast_dtype=self.autocast_dtype,
+                channels_last=channels_last,
             )
 
         if state_dict is not None:
-            for i in range(self.layer_number - 1):
-                print("Loading layer {}".format(i))
-                for j in [0, 1]:
-                    model.conv_layers[i][j].weight = torch.nn.Parameter(
-                        state_dict["conv_layers.{}.{}.weight".format(i, j)]
-                    )
-                    model.conv_layers[i][j].bias = torch.nn.Parameter(
-                        state_dict["conv_layers.{}.{}.bias".format(i, j)]
-                    )
+            model_state = model.state_dict()
+            conv_state_dict = {
+                k: v
+                for k, v in state_dict.items()
+                if k.startswith("conv_layers.")
+                and k in model_state
+                and v.shape == model_state[k].shape
+            }
+            skipped = sorted(set(state_dict) - set(conv_state_dict))
+            logger.debug(
+                "Loading %d tensors from state_dict, skipping %d: %s",
+                len(conv_state_dict),
+                len(skipped),
+                skipped,
+            )
+            missing, unexpected = model.load_state_dict(conv_state_dict, strict=False)
+            if missing:
+                logger.debug("Keys not found in state_dict: %s", missing)
+            if unexpected:
+                raise ValueError("Unexpected keys in state_dict: {}".format(unexpected))
 
         if device is not None:
             model.to(device)
 
+        if compile_model and not self.ts1d_model:
+            if hasattr(nn.Module, "compile"):
+                model.compile(mode="reduce-overhead", dynamic=False)
+            elif hasattr(torch, "compile"):
+                model.forward = torch.compile(
+                    model.forward, mode="reduce-overhead", dynamic=False
+                )
+            else:
+                logger.warning(
+                    "compile_model=True requires torch >= 2.0 (found %s); "
+                    "running the model eagerly",
+                    torch.__version__,
+                )
+
         return model
 
     # init_model_with_model_state_dict:
     #
     # Initializes a CNN model and loads full model state dict.
     # - Useful for fine-tuning or resuming training from a saved checkpoint.
-    # - Prints debug info confirming successful loading.
+    # - Logs (at DEBUG level) that the state dict is being loaded.
+    # - With inference=True, the model is put in eval mode and (for the 2D CNN)
+    #   BatchNorm layers are folded into the preceding convolutions or replaced
+    #   by a precomputed per-channel affine.
 
-    def init_model_with_model_state_dict(self, model_state_dict, device=None):
-        model = self.init_model(device=device)
-        print("Loading model from model_state_dict")
+    def init_model_with_model_state_dict(
+        self, model_state_dict, device=None, inference=False, compile_model=None
+    ):
+        model = self.init_model(device=device, compile_model=compile_model)
+        logger.debug("Loading model from model_state_dict")
         model.load_state_dict(model_state_dict)
+        if inference:
+            model.eval()
+            if not self.ts1d_model:
+                model.prepare_for_inference()
         return model
 
+    # init_scripted_model:
+    #
+    # Builds an inference-only TorchScript module from a saved model state dict.
+    # - Loads the weights in eval mode with BatchNorm already folded,
+    # - Scripts and freezes the module (parameters become constants),
+    # - Runs the JIT inference passes (Conv-BN-ReLU fusion etc.).
+    # The result cannot be trained or loaded with a state dict again.
+    #
+    # The model is never torch.compile'd here, since TorchScript cannot script
+    # a compiled forward. Freezing needs torch >= 1.8 and the inference passes
+    # torch >= 1.10; on older torch those steps are skipped with a warning.
+
+    def init_scripted_model(self, model_state_dict, device=None):
+        model = self.init_model_with_model_state_dict(
+            model_state_dict, device=device, inference=True, compile_model=False
+        )
+        scripted = torch.jit.script(model)
+        if not hasattr(torch.jit, "freeze"):
+            logger.warning(
+                "torch.jit.freeze requires torch >= 1.8 (found %s); "
+                "returning the scripted model unfrozen",
+                torch.__version__,
+            )
+            return scripted
+        scripted = torch.jit.freeze(scripted)
+        if not hasattr(torch.jit, "optimize_for_inference"):
+            logger.warning(
+                "torch.jit.optimize_for_inference requires torch >= 1.10 "
+                "(found %s); returning the frozen scripted model",
+                torch.__version__,
+            )
+            return scripted
+        return torch.jit.optimize_for_inference(scripted)
+
     # get_input_size:
     #
     # Returns the input size for the CNN based on the window size (`ws').
@@ -188,11 +307,7 @@ class Model(object):
     # and determines input shape for the model.
 
     def get_input_size(self):
-        if self.ts1d_model:
-            input_size_dict = {5: (6, 5), 20: (6, 20), 60: (6, 60)}
-        else:
-            input_size_dict = {5: (32, 15), 20: (64, 60), 60: (96, 180)}
-        return input_size_dict[self.ws]
+        return _TS1D_INPUT[self.ws] if self.ts1d_model else _TS2D_INPUT[self.ws]
 
     # model_summary:
     #
@@ -205,26 +320,42 @@ class Model(object):
     # - Appendix: Confirming number of layers, filters, and FC layers.
 
     def model_summary(self):
+        from torchsummary import summary
+
         print(self.name)
-        if self.ts1d_model:
-            img_size_dict = {5: (6, 5), 20: (6, 20), 60: (6, 60)}
-        else:
-            img_size_dict = {5: (1, 32, 15), 20: (1, 64, 60), 60: (1, 96, 180)}
+        img_size = (
+            _TS1D_INPUT[self.ws] if self.ts1d_model else (1,) + _TS2D_INPUT[self.ws]
+        )
         device = torch.device(
             "cuda:{}".format(0) if torch.cuda.is_available() else "cpu"
         )
         model = self.init_model()
         model.to(device)
         print(model)
-        summary(model, img_size_dict[self.ws])
+        summary(model, img_size)
+
+
+# _compute_padding:
+#
+# "Same"-style padding (filter_size // 2) for each layer. Memoized, so the
+# filter sizes must be passed as a tuple.
+
+@functools.lru_cache(maxsize=256)
+def _compute_padding(filter_size_list, ts1d):
+    if ts1d:
+        return tuple(int(fs / 2) for fs in filter_size_list)
+    return tuple((int(fs[0] / 2), int(fs[1] / 2)) for fs in filter_size_list)
 
 
 def init_weights(m):
-    if type(m) in [nn.Conv2d, nn.Conv1d]:
+    if isinstance(m, (nn.Conv2d, nn.Conv1d)):
         nn.init.xavier_uniform_(m.weight)
-    elif type(m) == nn.Linear:
+    elif isinstance(m, nn.Linear):
         nn.init.xavier_uniform_(m.weight)
         m.bias.data.fill_(0.01)
+    elif isinstance(m, (nn.BatchNorm1d, nn.BatchNorm2d)):
+        nn.init.ones_(m.weight)
+        nn.init.zeros_(m.bias)
 
 
 class Flatten(nn.Module):
@@ -232,7 +363,64 @@ class Flatten(nn.Module):
         super(Flatten, self).__init__()
 
     def forward(self, x):
-        return x.view(x.shape[0], np.prod(x.shape[1:]))
+        return torch.flatten(x, 1)
+
+# ChannelAffine:
+#
+# Per-channel y = scale * x + shift. Stands in for an eval-mode BatchNorm2d,
+# whose running statistics reduce it to exactly this affine map. Runs in
+# place when no gradient is needed.
+
+class ChannelAffine(nn.Module):
+    def __init__(self, scale, shift):
+        super(ChannelAffine, self).__init__()
+        self.register_buffer("scale", scale.reshape(1, -1, 1, 1))
+        self.register_buffer("shift", shift.reshape(1, -1, 1, 1))
+
+    def forward(self, x):
+        if x.requires_grad:
+            return x * self.scale + self.shift
+        return x.mul_(self.scale).add_(self.shift)
+
+# _conv_output_shape:
+#
+# Computes the spatial output shape of a stack of conv blocks analytically,
+# instead of running a dummy forward pass through the layers.
+# - Each conv applies floor((L + 2p - d(k - 1) - 1) / s + 1) per dimension,
+# - Each (ceil-mode, non-overlapping) max-pool applies ceil(L / mp).
+#
+# Works for both the 2D model (shape = (H, W), tuple settings) and the 1D
+# model (shape = (L,), int settings).
+
+def _conv_output_shape(
+    input_shape,
+    layer_number,
+    filter_size_list,
+    stride_list,
+    padding_list,
+    dilation_list,
+    max_pooling_list,
+):
+    ndim = len(input_shape)
+
+    def as_tuple(v):
+        return tuple(v) if isinstance(v, (tuple, list)) else (v,) * ndim
+
+    shape = tuple(input_shape)
+    for i in range(layer_number):
+        fs, st, pd, dl, mp = (
+            as_tuple(filter_size_list[i]),
+            as_tuple(stride_list[i]),
+            as_tuple(padding_list[i]),
+            as_tuple(dilation_list[i]),
+            as_tuple(max_pooling_list[i]),
+        )
+        shape = tuple(
+            -(-((size + 2 * pd[j] - dl[j] * (fs[j] - 1) - 1) // st[j] + 1) // mp[j])
+            for j, size in enumerate(shape)
+        )
+    return shape
+
 
 # CNNModel Class:
 #
@@ -267,11 +455,39 @@ class CNNModel(nn.Module):
         conv_layer_chanls=None,
         bn_loc="bn_bf_relu",
         regression_label=None,
+        channels_last=False,
+        autocast_dtype=None,
+        fuse_pool_into_stride=False,
     ):
 
+        # Downsample with the convolution itself instead of a separate max-pool:
+        # a stride-s conv followed by a ceil-mode mp pool yields the same output
+        # shape as a stride-(s * mp) conv, so the FC size is unchanged.
+        if fuse_pool_into_stride:
+            stride_list = [
+                (st[0] * mp[0], st[1] * mp[1])
+                for st, mp in zip(
+                    stride_list[:layer_number], max_pooling_list[:layer_number]
+                )
+            ]
+            max_pooling_list = [(1, 1)] * layer_number
+
         self.layer_number = layer_number
         self.input_size = input_size
         self.conv_layer_chanls = conv_layer_chanls
+        self.filter_size_list = filter_size_list
+        self.stride_list = stride_list
+        self.padding_list = padding_list
+        self.dilation_list = dilation_list
+        self.max_pooling_list = max_pooling_list
+        self.channels_last = channels_last
+        if autocast_dtype is not None and not hasattr(torch, "autocast"):
+            raise RuntimeError(
+                "autocast_dtype requires torch >= 1.10 (found {})".format(
+                    torch.__version__
+                )
+            )
+        self.autocast_dtype = autocast_dtype
         super(CNNModel, self).__init__()
         self.conv_layers = self._init_conv_layers(
             layer_number,
@@ -286,7 +502,7 @@ class CNNModel(nn.Module):
             lrelu,
             bn_loc,
         )
-        fc_size = self._get_conv_layers_flatten_size()
+        fc_size = self._compute_conv_out_shape(*self.input_size)
         if regression_label is not None:
             self.fc = nn.Linear(fc_size, 1)
         else:
@@ -294,6 +510,9 @@ class CNNModel(nn.Module):
         if xavier:
             self.conv_layers.apply(init_weights)
             self.fc.apply(init_weights)
+        # Store conv weights in NHWC once so cuDNN does not repack them per call.
+        if self.channels_last:
+            self.to(memory_format=torch.channels_last)
 
     @staticmethod
 
@@ -415,41 +634,51 @@ class CNNModel(nn.Module):
         else:
             assert len(self.conv_layer_chanls) == layer_number
             conv_layer_chanls = self.conv_layer_chanls
-        layers = []
-        prev_chanl = 1
-        for i, conv_chanl in enumerate(conv_layer_chanls):
-            layers.append(
-                self.conv_layer(
-                    prev_chanl,
-                    conv_chanl,
-                    filter_size=filter_size_list[i],
-                    stride=stride_list[i],
-                    padding=padding_list[i],
-                    dilation=dilation_list[i],
-                    max_pooling=max_pooling_list[i],
-                    batch_norm=batch_norm,
-                    lrelu=lrelu,
-                    bn_loc=bn_loc,
-                )
+        # Each conv block stays its own nn.Sequential so that state_dict keys
+        # (conv_layers.{block}.{layer}.*) match previously saved checkpoints.
+        layers = [
+            self.conv_layer(
+                prev_chanl,
+                conv_chanl,
+                filter_size=filter_size_list[i],
+                stride=stride_list[i],
+                padding=padding_list[i],
+                dilation=dilation_list[i],
+                max_pooling=max_pooling_list[i],
+                batch_norm=batch_norm,
+                lrelu=lrelu,
+                bn_loc=bn_loc,
+            )
+            for i, (prev_chanl, conv_chanl) in enumerate(
+                zip([1] + list(conv_layer_chanls[:-1]), conv_layer_chanls)
             )
-            prev_chanl = conv_chanl
-        layers.append(Flatten())
-        layers.append(nn.Dropout(p=drop_prob))
+        ] + [Flatten(), nn.Dropout(p=drop_prob)]
         return nn.Sequential(*layers)
 
-    # _get_conv_layers_flatten_size:
+    # _compute_conv_out_shape:
     #
     # Computes the flattened size of the final output after all convolutional
     # and pooling layers. This determines the input size to the first Fully
     # Connected (FC) layer.
     #
     # Critical for ensuring the FC layers are correctly sized, matching the
-    # model architecture as described in the Appendix.
+    # model architecture as described in the Appendix. Derived from the layer
+    # settings, so no dummy forward pass is needed at construction time.
 
-    def _get_conv_layers_flatten_size(self):
-        dummy_input = torch.rand((1, 1, self.input_size[0], self.input_size[1]))
-        x = self.conv_layers(dummy_input)
-        return x.shape[1]
+    def _compute_conv_out_shape(self, H, W):
+        final_H, final_W = _conv_output_shape(
+            (H, W),
+            self.layer_number,
+            self.filter_size_list,
+            self.stride_list,
+            self.padding_list,
+            self.dilation_list,
+            self.max_pooling_list,
+        )
+        out_chanl = [m for m in self.conv_layers.modules() if isinstance(m, nn.Conv2d)][
+            -1
+        ].out_channels
+        return final_H * final_W * out_chanl
 
     # forward:
     #
@@ -462,13 +691,72 @@ class CNNModel(nn.Module):
     #
     # This method directly implements the data flow described in:
     # - Section II: The CNN Model (Figure 3: Diagram of CNN models),
-    # - Appendix: Detailed architecture with Conv, BN, ReLU, MaxPool, FC.    
+    # - Appendix: Detailed architecture with Conv, BN, ReLU, MaxPool, FC.
+    #
+    # With channels_last enabled the input is converted to NHWC on entry, so
+    # cuDNN runs NHWC kernels directly instead of inserting layout conversions.
+    # With autocast_dtype set (e.g. torch.bfloat16), the conv and FC layers run
+    # under mixed precision and the logits are cast back to float32.
 
     def forward(self, x):
+        if self.channels_last:
+            x = x.contiguous(memory_format=torch.channels_last)
+        if self.autocast_dtype is not None:
+            with torch.autocast(device_type=x.device.type, dtype=self.autocast_dtype):
+                x = self.conv_layers(x)
+                x = self.fc(x)
+            return x.float()
         x = self.conv_layers(x)
         x = self.fc(x)
         return x
 
+    # fuse_bn_:
+    #
+    # Folds every BatchNorm2d that directly follows a Conv2d (the default
+    # "bn_bf_relu" placement) into the convolution, in place:
+    #   W' = W * gamma / sqrt(var + eps),  b' = (b - mean) * gamma / sqrt(var + eps) + beta
+    # The BatchNorm is replaced by nn.Identity, so layer indices are unchanged.
+    #
+    # Only valid in eval mode, where BatchNorm uses its running statistics.
+
+    @torch.no_grad()
+    def fuse_bn_(self):
+        assert not self.training, "fuse_bn_ requires the model in eval mode"
+        for block in self.conv_layers.modules():
+            if not isinstance(block, nn.Sequential):
+                continue
+            for i in range(len(block) - 1):
+                conv, bn = block[i], block[i + 1]
+                if not (isinstance(conv, nn.Conv2d) and isinstance(bn, nn.BatchNorm2d)):
+                    continue
+                scale = bn.weight / torch.sqrt(bn.running_var + bn.eps)
+                conv.weight.mul_(scale.reshape(-1, 1, 1, 1))
+                conv.bias.copy_((conv.bias - bn.running_mean) * scale + bn.bias)
+                block[i + 1] = nn.Identity()
+        return self
+
+    # prepare_for_inference:
+    #
+    # Removes BatchNorm2d from the eval-time forward pass entirely:
+    # - BNs directly after a Conv2d are folded into it (fuse_bn_),
+    # - the remaining BNs ("bn_af_relu", "bn_af_mp") become a ChannelAffine
+    #   with a = gamma / sqrt(var + eps), b = beta - mean * a.
+    #
+    # The resulting state_dict no longer matches a training checkpoint.
+
+    @torch.no_grad()
+    def prepare_for_inference(self):
+        self.fuse_bn_()
+        for block in self.conv_layers.modules():
+            if not isinstance(block, nn.Sequential):
+                continue
+            for i, bn in enumerate(block):
+                if not isinstance(bn, nn.BatchNorm2d):
+                    continue
+                scale = bn.weight / torch.sqrt(bn.running_var + bn.eps)
+                block[i] = ChannelAffine(scale, bn.bias - bn.running_mean * scale)
+        return self
+
 # CNN1DModel Class:
 #
 # Defines an alternative 1D CNN architecture for time-series inputs.
@@ -495,9 +783,18 @@ class CNN1DModel(nn.Module):
         dilation_list=[1],
         max_pooling_list=[2],
         regression_label=None,
+        ts1d_depthwise=False,
+        ts1d_as_2d=False,
     ):
         self.layer_number = layer_number
         self.input_size = input_size
+        self.ts1d_depthwise = ts1d_depthwise
+        self.ts1d_as_2d = ts1d_as_2d
+        self.filter_size_list = filter_size_list
+        self.stride_list = stride_list
+        self.padding_list = padding_list
+        self.dilation_list = dilation_list
+        self.max_pooling_list = max_pooling_list
         super(CNN1DModel, self).__init__()
 
         self.conv_layers = self._init_ts1d_conv_layers(
@@ -510,13 +807,24 @@ class CNN1DModel(nn.Module):
             dilation_list,
             max_pooling_list,
         )
-        fc_size = self._get_ts1d_conv_layers_flatten_size()
+        fc_size = self._compute_ts1d_conv_out_shape(self.input_size[1])
         if regression_label is not None:
             self.fc = nn.Linear(fc_size, 1)
         else:
             self.fc = nn.Linear(fc_size, 2)
         self.conv_layers.apply(init_weights)
         self.fc.apply(init_weights)
+        if self.ts1d_as_2d:
+            self.to(memory_format=torch.channels_last)
+
+    # conv_layer_1d:
+    #
+    # Builds a single 1D conv block: Conv1d → BatchNorm1d → LeakyReLU → MaxPool1d.
+    # With depthwise=True, the dense Conv1d is split into a depthwise Conv1d
+    # (one filter per input feature, same padding/stride/dilation) followed by
+    # a 1×1 pointwise Conv1d that mixes the features into out_chanl channels.
+    # With as_2d=True, the same block is built from 2D layers with a trailing
+    # width-1 dimension (kernel (k, 1)), so it can run in channels_last layout.
 
     @staticmethod
     def conv_layer_1d(
@@ -527,19 +835,48 @@ class CNN1DModel(nn.Module):
         padding=1,
         dilation=1,
         max_pooling=2,
+        depthwise=False,
+        as_2d=False,
     ):
-        layers = [
-            nn.Conv1d(
+        if as_2d:
+            conv_cls, bn_cls, pool_cls = nn.Conv2d, nn.BatchNorm2d, nn.MaxPool2d
+
+            def dim(v, w):
+                return (v, w)
+
+        else:
+            conv_cls, bn_cls, pool_cls = nn.Conv1d, nn.BatchNorm1d, nn.MaxPool1d
+
+            def dim(v, w):
+                return v
+
+        if depthwise:
+            conv = nn.Sequential(
+                conv_cls(
+                    in_chanl,
+                    in_chanl,
+                    dim(filter_size, 1),
+                    stride=dim(stride, 1),
+                    padding=dim(padding, 0),
+                    dilation=dim(dilation, 1),
+                    groups=in_chanl,
+                ),
+                conv_cls(in_chanl, out_chanl, dim(1, 1)),
+            )
+        else:
+            conv = conv_cls(
                 in_chanl,
                 out_chanl,
-                filter_size,
-                stride=stride,
-                padding=padding,
-                dilation=dilation,
-            ),
-            nn.BatchNorm1d(out_chanl),
+                dim(filter_size, 1),
+                stride=dim(stride, 1),
+                padding=dim(padding, 0),
+                dilation=dim(dilation, 1),
+            )
+        layers = [
+            conv,
+            bn_cls(out_chanl),
             nn.LeakyReLU(),
-            nn.MaxPool1d(max_pooling, ceil_mode=True),
+            pool_cls(dim(max_pooling, 1), ceil_mode=True),
         ]
         return nn.Sequential(*layers)
 
@@ -555,36 +892,61 @@ class CNN1DModel(nn.Module):
         max_pooling_list,
     ):
         conv_layer_chanls = [inplanes * (2**i) for i in range(layer_number)]
-        layers = []
-        prev_chanl = 6
-        for i, conv_chanl in enumerate(conv_layer_chanls):
-            layers.append(
-                self.conv_layer_1d(
-                    prev_chanl,
-                    conv_chanl,
-                    filter_size=filter_size_list[i],
-                    stride=stride_list[i],
-                    padding=padding_list[i],
-                    dilation=dilation_list[i],
-                    max_pooling=max_pooling_list[i],
-                )
+        layers = [
+            self.conv_layer_1d(
+                prev_chanl,
+                conv_chanl,
+                filter_size=filter_size_list[i],
+                stride=stride_list[i],
+                padding=padding_list[i],
+                dilation=dilation_list[i],
+                max_pooling=max_pooling_list[i],
+                depthwise=self.ts1d_depthwise,
+                as_2d=self.ts1d_as_2d,
+            )
+            for i, (prev_chanl, conv_chanl) in enumerate(
+                zip([6] + conv_layer_chanls[:-1], conv_layer_chanls)
             )
-            prev_chanl = conv_chanl
-        layers.append(Flatten())
-        layers.append(nn.Dropout(p=drop_prob))
+        ] + [Flatten(), nn.Dropout(p=drop_prob)]
         return nn.Sequential(*layers)
 
-    def _get_ts1d_conv_layers_flatten_size(self):
-        dummy_input = torch.rand((1, self.input_size[0], self.input_size[1]))
-        x = self.conv_layers(dummy_input)
-        return x.shape[1]
+    def _compute_ts1d_conv_out_shape(self, L):
+        (final_L,) = _conv_output_shape(
+            (L,),
+            self.layer_number,
+            self.filter_size_list,
+            self.stride_list,
+            self.padding_list,
+            self.dilation_list,
+            self.max_pooling_list,
+        )
+        out_chanl = [
+            m
+            for m in self.conv_layers.modules()
+            if isinstance(m, (nn.Conv1d, nn.Conv2d))
+        ][-1].out_channels
+        return final_L * out_chanl
+
+    # forward:
+    #
+    # With ts1d_as_2d, the (B, C, L) input is viewed as (B, C, L, 1) and laid
+    # out channels-last, so the (k, 1) convolutions run on NHWC kernels.
+    # Flattening (B, C, L, 1) gives the same feature order as (B, C, L).
 
     def forward(self, x):
+        if self.ts1d_as_2d:
+            x = x.unsqueeze(-1).contiguous(memory_format=torch.channels_last)
         x = self.conv_layers(x)
         x = self.fc(x)
         return x
 
 
+# get_full_model_name:
+#
+# Builds the model name used for checkpoints, logs and result files.
+# Memoized, so all list-valued arguments must be passed as tuples.
+
+@functools.lru_cache(maxsize=256)
 def get_full_model_name(
     ts1d_model,
     ws,
@@ -653,20 +1015,22 @@ def get_full_model_name(
     return arch_name
 
 
+# all_layers:
+#
+# Returns the leaf modules of `model' in forward (left-to-right) order, using
+# an explicit stack instead of recursion. Descends into any container, not
+# only nn.Sequential.
+
 def all_layers(model):
-    all_layers = []
-
-    def remove_sequential(network):
-        for layer in network.children():
-            if isinstance(
-                layer, nn.Sequential
-            ):
-                remove_sequential(layer)
-            if list(layer.children()) == []:
-                all_layers.append(layer)
-
-    remove_sequential(model)
-    return all_layers
+    out, stack = [], [model]
+    while stack:
+        m = stack.pop()
+        kids = list(m.children())
+        if not kids:
+            out.append(m)
+        else:
+            stack.extend(reversed(kids))
+    return out
 
 
 def benchmark_model_summary():